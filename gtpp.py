@@ -1,16 +1,36 @@
 #!/usr/bin/env python3
 
 import argparse
-from collections import OrderedDict
-import colorama
-from colorama import Fore, Style
-from functools import wraps
+from collections import namedtuple
 import os
 import re
 import shutil
 import signal
 import subprocess
 import sys
+from typing import Optional, Tuple
+
+# If output is redirected, colorama.init() would only strip out any colors we
+# write, so don't bother loading colorama or generating them.
+use_color = sys.stdout.isatty()
+if use_color:
+    import colorama
+    from colorama import Fore, Style
+else:
+    class Fore:
+        BLACK = RED = GREEN = YELLOW = BLUE = MAGENTA = CYAN = WHITE = RESET = ''
+
+    class Style:
+        BRIGHT = DIM = NORMAL = RESET_ALL = ''
+
+# Bound once, since status lines are printed for every test
+_RED = Fore.RED
+_GREEN = Fore.GREEN
+_CYAN = Fore.CYAN
+_YELLOW = Fore.YELLOW
+_RESET = Style.RESET_ALL
+
+_FAILED_TESTS_HEADER = _RED + 'FAILED TESTS:' + _RESET
 
 # Source: http://stackoverflow.com/a/2549950/25507
 signal_names = dict((k, v) for v, k in reversed(sorted(signal.__dict__.items()))
@@ -39,38 +59,108 @@ def plural(text, count):
     return text if count == 1 else text + 's'
 
 
+Handler = namedtuple('Handler', 'regex func prefixes in_test')
+
+
 class LineHandler(object):
-    """Offers decorators for setting up regex-based parsing of line input."""
+    """Offers decorators for setting up regex-based parsing of line input.
+
+    Each handler declares the characters that lines it matches can start
+    with.  Handlers are grouped by those characters, and each group's regexes
+    are combined into a single alternation, so processing a line takes at
+    most one regex search, and lines that can't match any handler (most raw
+    test output) take none.
+
+    While the owner's in_test attribute is true, only handlers added with
+    in_test=True are tried."""
 
     def __init__(self):
         self._handlers = []
+        self._by_prefix = None
+
+    def __set_name__(self, owner, name):
+        # Called once the owning class's body, and so every @add decorator,
+        # has run.
+        self.compile()
+
+    def compile(self):
+        """Builds the combined regexes from all handlers added so far."""
+        self._by_prefix = {}
+        for in_test in (False, True):
+            handlers = [h for h in self._handlers if h.in_test or not in_test]
+
+            grouped = {}
+            for handler in handlers:
+                for prefix in handler.prefixes:
+                    grouped.setdefault(prefix, []).append(handler)
+
+            self._by_prefix[in_test] = {}
+            for prefix, prefix_handlers in grouped.items():
+                self._by_prefix[in_test][prefix] = self._combine(prefix_handlers)
+
+    @staticmethod
+    def _combine(handlers):
+        """Combines handlers' regexes into a single alternation, with a group
+        around each handler's regex.
+
+        Returns the combined regex and a list that maps each of those groups'
+        indexes (which is a match's lastindex, since it's the last group to
+        close) to the handler's function and the range of its groups within
+        the combined regex."""
+        sources = []
+        dispatch = [None]
+        for handler in handlers:
+            regex = handler.regex
+            sources.append('(%s)' % regex.pattern)
+            # The handler's own groups immediately follow its enclosing group.
+            group_index = len(dispatch)
+            dispatch.append((handler.func, group_index, group_index + regex.groups))
+            dispatch.extend([None] * regex.groups)
+        return re.compile('|'.join(sources)), dispatch
 
     def process(self, owner, line):
-        for h in self._handlers:
-            if h(owner, line):
-                return True
+        candidates = self._by_prefix[owner.in_test].get(line[:1])
+        if candidates is None:
+            return False
+        regex, dispatch = candidates
+        m = regex.match(line)
+        if not m:
+            return False
+        f, start, end = dispatch[m.lastindex]
+        result = f(owner, *m.groups()[start:end])
+        if result is not None:
+            return result
+        else:
+            return True
 
-    def add(self, regex):
-        if isinstance(regex, str):
-            regex = re.compile(regex)
+    def add(self, regex, prefixes, in_test=False):
+        """Adds a handler for lines matching regex, a compiled pattern that's
+        matched at the start of the line.  prefixes lists each possible first
+        character of those lines.  in_test says whether the line can occur
+        while a test is running."""
+        assert isinstance(regex, re.Pattern), 'handler regexes must be precompiled'
 
         def decorator(f):
-            @wraps(f)
-            def wrapper(self, line):
-                m = regex.search(line)
-                if not m:
-                    return False
-                result = f(self, *m.groups())
-                if result is not None:
-                    return result
-                else:
-                    return True
+            self._handlers.append(Handler(regex, f, prefixes, in_test))
+            return f
 
-            self._handlers.append(wrapper)
+        return decorator
 
-            return wrapper
 
-        return decorator
+# Google Test output lines recognized by Parser's handlers.  Each is matched
+# at the start of a line.
+START_RE = re.compile(r'\[=+\] Running (\d+) tests? from (\d+) test cases?')
+FINISH_RE = re.compile(r'\[=+\] (\d+) tests? from (\d+) test cases? ran\.?(.*)')
+SUMMARY_PASSED_RE = re.compile(r'\[ *PASSED *\] (\d+) tests?')
+SUMMARY_FAILED1_RE = re.compile(r'\[ *FAILED *\] (\d+) tests?, listed below')
+SUMMARY_FAILED2_RE = re.compile(r' *(\d+) FAILED TESTS?')
+SUMMARY_DISABLED_RE = re.compile(r' *YOU HAVE (\d+) DISABLED TESTS?')
+TEST_CASE_RE = re.compile(r'\[-+\] (\d+) tests? from (.*)')
+START_TEST_RE = re.compile(r'\[ *RUN *\] (.*)\.(.*)')
+STOP_TEST_RE = re.compile(r'\[ *(OK|FAILED) *\] (.*)\.(.*)')
+GLOBAL_SETUP_RE = re.compile(r'\[-+\] Global test environment set-up')
+GLOBAL_TEARDOWN_RE = re.compile(r'\[-+\] Global test environment tear-down')
+FILTER_RE = re.compile(r'Note: Google Test filter = (.*)')
 
 
 class Parser(object):
@@ -79,70 +169,100 @@ class Parser(object):
     Parsed output is used to generate test events, which are dispatched to our
     own Output class."""
 
-    TIME_RE = r'(?: \((\d+) ms(?: total)?\))?'
+    __slots__ = ('output', 'total_test_count', 'total_test_case_count', 'test_case_index',
+                 'current_test_case', 'current_test_count', 'current_test', 'test_index',
+                 'current_fail_count', 'in_test', 'is_summarizing_failures',
+                 'in_test_suite', 'has_failures')
 
     handler = LineHandler()
 
-    def __init__(self, output):
+    def __init__(self, output: 'BaseOutput') -> None:
         self.output = output
 
         self.total_test_count = 0
         self.total_test_case_count = 0
         self.test_case_index = 0
 
-        self.current_test_case = None
+        self.current_test_case: Optional[str] = None
         self.current_test_count = 0
-        self.current_test = None
+        self.current_test: Optional[str] = None
         self.test_index = 0
         self.current_fail_count = 0
 
+        # Whether we're between a test's RUN and OK / FAILED lines.  Little
+        # else can occur there, so most handlers needn't be tried.
+        self.in_test = False
+
+        self.is_summarizing_failures = False
+
         # Public properties
         self.in_test_suite = False
         self.has_failures = False    # Has any test ever failed?
 
-    def process(self, line):
-        if not self.handler.process(self, line):
+    def process(self, line: str) -> None:
+        """Processes a line of output, without its trailing newline."""
+        # Blank lines are common, so check for them before trying handlers.
+        # Within a test case, they're raw output; elsewhere, we ignore them.
+        if not line:
+            if self.current_test_case:
+                self.output.raw_output(self.current_test, line)
+        elif not self.handler.process(self, line):
             self.output.raw_output(self.current_test, line)
 
     @staticmethod
-    def parse_time(time):
-        if time is not None:
-            return int(time)
-        else:
-            return None
-
-    @handler.add(r'Running (\d+) tests? from (\d+) test cases?')
-    def start(self, total_test_count, total_test_case_count):
+    def split_time(text: str) -> Tuple[str, Optional[int]]:
+        """Splits Google Test's " (N ms)" or " (N ms total)" suffix from text.
+
+        Returns the remaining text and the time in milliseconds, or None if
+        there is no time."""
+        if text.endswith((' ms)', ' ms total)')):
+            head, sep, tail = text.rpartition(' (')
+            time = tail.split(' ', 1)[0]
+            if sep and time.isdecimal():
+                return head, int(time)
+        return text, None
+
+    @handler.add(START_RE, '[')
+    def start(self, total_test_count: str, total_test_case_count: str) -> None:
         self.total_test_count = int(total_test_count)
         self.total_test_case_count = int(total_test_case_count)
         self.in_test_suite = True
         self.is_summarizing_failures = False
 
-    @handler.add(r'(\d+) tests? from (\d+) test cases? ran. ?' + TIME_RE + '$')
-    def finish(self, total_test_count, total_test_case_count, time):
-        self.output.finish(int(total_test_count), int(total_test_case_count), self.parse_time(time))
+    @handler.add(FINISH_RE, '[')
+    def finish(self, total_test_count: str, total_test_case_count: str, details: str) -> None:
+        time = self.split_time(details)[1]
+        self.output.finish(int(total_test_count), int(total_test_case_count), time)
         self.in_test_suite = False
 
-    @handler.add(r'\[ *PASSED *\] (\d+) tests?')
-    def summary_passed(self, passed_test_count):
+    @handler.add(SUMMARY_PASSED_RE, '[')
+    def summary_passed(self, passed_test_count: str) -> None:
         pass
 
-    @handler.add(r'\[ *FAILED *\] (\d+) tests?, listed below')
-    def summary_failed1(self, failed_test_count):
+    @handler.add(SUMMARY_FAILED1_RE, '[')
+    def summary_failed1(self, failed_test_count: str) -> None:
         self.is_summarizing_failures = True
         pass
 
-    @handler.add(r'(\d+) FAILED TESTS?')
-    def summary_failed2(self, failed_test_count):
+    @handler.add(SUMMARY_FAILED2_RE, ' 0123456789')
+    def summary_failed2(self, failed_test_count: str) -> None:
         pass
 
-    @handler.add(r'YOU HAVE (\d+) DISABLED TESTS?')
-    def summary_disabled(self, disabled_test_count):
+    @handler.add(SUMMARY_DISABLED_RE, ' ')
+    def summary_disabled(self, disabled_test_count: str) -> None:
         self.output.disabled(int(disabled_test_count))
 
-    @handler.add(r'\[-+\] (\d+) tests? from (.*?)(?:, where (.*?))?' + TIME_RE + '$')
-    def start_stop_test_case(self, test_count, test_case, where=None, time=None):
+    # Test case and test starts are also recognized within a test, so that a
+    # test end we don't parse (such as newer Google Tests' "[  SKIPPED ]")
+    # can't leave us stuck there.
+    @handler.add(TEST_CASE_RE, '[', in_test=True)
+    def start_stop_test_case(self, test_count: str, details: str) -> None:
+        name, time = self.split_time(details)
+        test_case, sep, where_text = name.partition(', where ')
+        where = where_text if sep else None
+
         self.current_test = None
+        self.in_test = False
         if not self.current_test_case:
             self.current_test_case = test_case
             self.current_test_count = int(test_count)
@@ -155,87 +275,173 @@ class Parser(object):
         else:
             self.output.stop_test_case(
                 test_case, self.test_case_index, self.total_test_case_count,
-                self.current_test_count, self.current_fail_count, self.parse_time(time))
+                self.current_test_count, self.current_fail_count, time)
             self.current_test_case = None
 
-    @handler.add(r'\[ *RUN *\] (.*)\.(.*)')
-    def start_test(self, test_case, test):
+    @handler.add(START_TEST_RE, '[', in_test=True)
+    def start_test(self, test_case: str, test: str) -> None:
         self.current_test = None
+        self.in_test = True
         self.test_index += 1
         self.output.start_test(test_case, test, self.test_index, self.current_test_count)
 
-    @handler.add(r'\[ *(OK|FAILED) *\] (.*)\.(.*?)' + TIME_RE + '$')
-    def stop_test(self, status, test_case, test, time=None):
+    @handler.add(STOP_TEST_RE, '[', in_test=True)
+    def stop_test(self, status: str, test_case: str, test: str) -> None:
+        test, time = self.split_time(test)
         if self.is_summarizing_failures:
             return
 
         self.current_test = None
+        self.in_test = False
         if status == 'FAILED':
             self.current_fail_count += 1
             self.has_failures = True
         self.output.stop_test(
-            status, test_case, test, self.test_index, self.current_test_count,
-            self.parse_time(time))
+            status, test_case, test, self.test_index, self.current_test_count, time)
 
-    @handler.add(r'Global test environment set-up')
-    def global_setup(self):
+    @handler.add(GLOBAL_SETUP_RE, '[')
+    def global_setup(self) -> None:
         self.output.global_setup(self.total_test_count, self.total_test_case_count)
 
-    @handler.add(r'Global test environment tear-down')
-    def global_teardown(self):
+    @handler.add(GLOBAL_TEARDOWN_RE, '[')
+    def global_teardown(self) -> None:
         self.output.global_teardown()
 
-    @handler.add(r'Note: Google Test filter = (.*)')
-    def filter(self, filter):
+    @handler.add(FILTER_RE, 'N')
+    def filter(self, filter: str) -> None:
         self.output.filter(filter)
 
-    @handler.add(r'^$')
-    def blank_line(self):
-        if self.current_test_case:
-            # Within a test, return False so it's treated as raw output.
-            return False
+
+# An ANSI color code, which takes no space on screen
+ANSI_RE = re.compile(r'\x1b\[\d+m')
 
 
 class LinePrinter(object):
+    __slots__ = ('prev_line_len', 'needs_newline', 'is_tty', 'out', 'encoding', 'errors',
+                 'buffered', 'raw_buffer', 'pending')
+
+    # Maximum number of raw output lines to hold before writing them out
+    RAW_BUFFER_LINES = 1000
+
     def __init__(self):
         self.prev_line_len = 0
         self.needs_newline = False
 
+        self.is_tty = sys.stdout.isatty()
+
+        # If nothing (such as colorama) has wrapped stdout to filter our
+        # output, bypass its text layer and write encoded bytes directly.
+        # On Windows, keep the text layer so it translates newlines.
+        if sys.stdout is sys.__stdout__ and os.linesep == '\n':
+            sys.stdout.flush()
+            self.out = sys.stdout.buffer
+            self.encoding = sys.stdout.encoding
+            self.errors = sys.stdout.errors
+        else:
+            self.out = None
+
+        # If output is redirected, nobody is watching it scroll by, so collect
+        # raw output and write it in batches, and hold each status line until
+        # it's finished instead of writing every update that overwrites it.
+        self.buffered = not self.is_tty
+        self.raw_buffer = []
+        self.pending = ''
+
+    def write(self, text):
+        """Writes text to stdout in a single call."""
+        if self.out is None:
+            sys.stdout.write(text)
+            return
+
+        self.out.write(text.encode(self.encoding, self.errors))
+        if self.is_tty:
+            self.out.flush()
+
+    def flush(self):
+        """Writes any buffered output."""
+        if self.raw_buffer:
+            self.write(''.join(self.raw_buffer))
+            self.raw_buffer = []
+        if self.pending:
+            self.write(self.pending)
+            self.pending = ''
+
     def print_noeol(self, line):
+        if self.pending:
+            # The line being replaced was never written, so there's nothing
+            # to go back over.
+            self.pending = ''
+            self.needs_newline = False
+
+        self.flush()
         if self.needs_newline:
-            print('\r', end='')
+            prefix = '\r'
         else:
+            prefix = ''
             self.prev_line_len = 0
 
-        line_no_ansi = re.sub('\x1b\\[\\d+m', '', line)
-        line_len = len(line_no_ansi)
-        if self.prev_line_len > line_len:
-            line = line + ' ' * (self.prev_line_len - line_len)
+        if '\x1b' in line:
+            line_len = len(ANSI_RE.sub('', line))
+        else:
+            line_len = len(line)
 
-        print(line, end='')
+        # Pad to cover the previous line.  ANSI codes take no space on screen,
+        # so allow for them.
+        line = line.ljust(self.prev_line_len + len(line) - line_len)
+
+        if self.buffered:
+            self.pending = prefix + line
+        else:
+            self.write(prefix + line)
         self.needs_newline = True
         self.prev_line_len = line_len
 
     def print(self, line=''):
+        self.flush()
+
+        # Lines from Google Test arrive without their newlines, but allow for
+        # lines that have one anyway; remove any newlines then add our own.
+        text = line.rstrip('\n') + '\n'
         if self.needs_newline:
-            self.newline()
+            text = '\n' + text
+            self.prev_line_len = 0
+            self.needs_newline = False
+
+        self.write(text)
 
-        # Our lines are piped from Google Test and typically have their own
-        # newline.  To allow both those and normal Python usage, remove any
-        # newlines then add our own.
-        print(line.rstrip('\n'))
+    def print_raw(self, line):
+        """Prints a line of raw test output.  Like print, but may be buffered."""
+        if not self.buffered:
+            self.print(line)
+            return
+
+        if self.needs_newline:
+            self.newline()
+        self.raw_buffer.append(line.rstrip('\n') + '\n')
+        if len(self.raw_buffer) >= self.RAW_BUFFER_LINES:
+            self.flush()
 
     def newline(self):
-        print()
+        self.flush()
+        self.write('\n')
         self.prev_line_len = 0
         self.needs_newline = False
 
 
 class BaseOutput(object):
+    __slots__ = ('characters', '_empty', '_success', '_fail', '_busy', 'print_time', 'printer',
+                 'is_filtered')
+
     def __init__(self, characters=UnicodeCharacters, print_time=0):
         self.characters = characters
         self.print_time = print_time
 
+        # Status characters, looked up once instead of for every status line
+        self._empty = characters.empty
+        self._success = characters.success
+        self._fail = characters.fail
+        self._busy = characters.busy
+
         self.printer = LinePrinter()
 
         self.is_filtered = False
@@ -244,33 +450,31 @@ class BaseOutput(object):
         """Helper method: Formats final results if there are any failures."""
         tests = plural('test', test_count)
         test_cases = plural('test case', test_case_count)
-        return ('%i/%i %s from %i %s failed'
-                % (fail_count, test_count, tests, test_case_count, test_cases))
+        return f'{fail_count}/{test_count} {tests} from {test_case_count} {test_cases} failed'
 
     def format_passed(self, test_count, test_case_count):
         """Helper method: Formats final results if everything passed."""
         tests = plural('test', test_count)
         test_cases = plural('test case', test_case_count)
-        return ('%i/%i %s from %i %s passed'
-                % (test_count, test_count, tests, test_case_count, test_cases))
+        return f'{test_count}/{test_count} {tests} from {test_case_count} {test_cases} passed'
 
     def format_time(self, time):
         """Helper method: Formats a time in msec for display."""
         if time is not None and time >= self.print_time:
-            return ' (%s ms)' % time
+            return f' ({time} ms)'
         else:
             return ''
 
     def filter(self, filter):
         # Duplicate message from native Google Test
-        self.printer.print(Fore.YELLOW + 'Note: Google Test filter = %s' % filter + Style.RESET_ALL)
+        self.printer.print(_YELLOW + 'Note: Google Test filter = %s' % filter + _RESET)
         self.is_filtered = True
 
     def disabled(self, disabled_test_count):
         # Duplicate message from native Google Test
         message = ('YOU HAVE %i DISABLED %s'
                    % (disabled_test_count, plural('test', disabled_test_count).upper()))
-        self.printer.print(Fore.YELLOW + message + Style.RESET_ALL)
+        self.printer.print(_YELLOW + message + _RESET)
 
     def raw_output(self, test, line):
         raise NotImplementedError
@@ -304,15 +508,21 @@ class ListOutput(BaseOutput):
 
     Lists test cases, with more detail for failed tests."""
 
+    __slots__ = ('current_test_case_has_output', 'progress_len',
+                 '_progress_counts', '_progress', 'current_test_output',
+                 'failed_test_output', 'test_case_index', 'total_test_case_count')
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
         # Internal state
         self.current_test_case_has_output = False
         self.progress_len = 0
+        self._progress_counts = None
+        self._progress = None
 
         self.current_test_output = []
-        self.failed_test_output = OrderedDict()
+        self.failed_test_output = {}
 
         # Test progress - provided to start_test_case and stored for use in
         # start_test
@@ -320,8 +530,12 @@ class ListOutput(BaseOutput):
         self.total_test_case_count = None
 
     def progress(self, current, total):
-        total = str(total)
-        return '%*i / ' % (len(total), current) + total
+        # Each test case's progress is printed at least twice (when it starts
+        # and stops), so reuse the last string when we can.
+        if (current, total) != self._progress_counts:
+            self._progress_counts = (current, total)
+            self._progress = '%*i / %i' % (len(str(total)), current, total)
+        return self._progress
 
     def space_for_progress(self, current, total, char=' '):
         return char * len(self.progress(current, total))
@@ -339,32 +553,30 @@ class ListOutput(BaseOutput):
                      color=None, details=None, force_progress=False, progress_space=' '):
         """Implementation: Prints a line of test / test case progress."""
         if test_case_index is None:
-            line = progress_space * self.progress_len
+            progress = progress_space * self.progress_len
         elif self.printer.needs_newline or force_progress:
-            line = self.progress(test_case_index, total_test_case_count)
-            self.progress_len = len(line)
+            progress = self.progress(test_case_index, total_test_case_count)
+            self.progress_len = len(progress)
         else:
-            line = self.space_for_progress(test_case_index, total_test_case_count)
-            self.progress_len = len(line)
+            progress = self.space_for_progress(test_case_index, total_test_case_count)
+            self.progress_len = len(progress)
 
         if color:
-            line += color
-        line += ' ' + character + ' ' + test_case
-        if color:
-            line += Style.RESET_ALL
-        if details:
-            line += details
+            parts = (progress, color, ' ', character, ' ', test_case, _RESET,
+                     details or '')
+        else:
+            parts = (progress, ' ', character, ' ', test_case, details or '')
 
-        self.printer.print_noeol(line)
+        self.printer.print_noeol(''.join(parts))
 
     def raw_output(self, test, line):
         self.current_test_case_has_output = True
-        self.printer.print(line)
+        self.printer.print_raw(line)
         self.current_test_output.append(line)
 
     def start_test_case(self, test_case, test_case_index, total_test_case_count, where=None):
         self.print_status(test_case, test_case_index, total_test_case_count,
-                          self.characters.empty, Fore.CYAN, force_progress=True)
+                          self._empty, _CYAN, force_progress=True)
 
         self.test_case_index = test_case_index
         self.total_test_case_count = total_test_case_count
@@ -375,10 +587,10 @@ class ListOutput(BaseOutput):
         time_details = self.format_time(time)
         if not fail_count:
             self.print_status(test_case, test_case_index, total_test_case_count,
-                              self.characters.success, Fore.GREEN, details=time_details)
+                              self._success, _GREEN, details=time_details)
         else:
             self.print_status(test_case, test_case_index, total_test_case_count,
-                              self.characters.fail, Fore.RED,
+                              self._fail, _RED,
                               ' - %i/%i failed%s' % (fail_count, test_count, time_details))
 
         self.printer.newline()
@@ -387,7 +599,7 @@ class ListOutput(BaseOutput):
         test_case_index, total_test_case_count = self.progress_counts()
 
         self.print_status(test_case + '.' + test, test_case_index, total_test_case_count,
-                          self.characters.empty, Fore.CYAN)
+                          self._empty, _CYAN)
 
         self.current_test_output = []
 
@@ -397,49 +609,52 @@ class ListOutput(BaseOutput):
             return
 
         test_case_index, total_test_case_count = self.progress_counts()
+        test_and_case = test_case + '.' + test
 
         if status == 'FAILED':
-            self.print_status(test_case + '.' + test, test_case_index, total_test_case_count,
-                              self.characters.fail, Fore.RED)
-            self.failed_test_output[test_case + '.' + test] = self.current_test_output
+            self.print_status(test_and_case, test_case_index, total_test_case_count,
+                              self._fail, _RED)
+            self.failed_test_output[test_and_case] = self.current_test_output
         else:
-            self.print_status(test_case + '.' + test, test_case_index, total_test_case_count,
-                              self.characters.success, Fore.GREEN)
+            self.print_status(test_and_case, test_case_index, total_test_case_count,
+                              self._success, _GREEN)
 
         self.printer.newline()
         self.current_test_case_has_output = True
 
     def global_setup(self, total_test_count, total_test_case_count):
-        self.total_total_test_case_count = total_test_case_count
-        self.print_status('Setup', None, None, self.characters.empty)
+        self.print_status('Setup', None, None, self._empty)
 
     def global_teardown(self):
-        self.print_status('Teardown', None, None, self.characters.empty)
+        self.print_status('Teardown', None, None, self._empty)
 
     def finish(self, total_test_count, total_test_case_count, time):
         time_details = self.format_time(time)
         if not self.failed_test_output:
             passed_details = ' - ' + self.format_passed(total_test_count, total_test_case_count)
-            self.print_status('Finished', None, None, self.characters.success, Fore.GREEN,
+            self.print_status('Finished', None, None, self._success, _GREEN,
                               details=passed_details + time_details, progress_space='-')
         else:
             failed_details = ' - ' + self.format_failed(
                 len(self.failed_test_output), total_test_count, total_test_case_count)
-            self.print_status('Finished', None, None, self.characters.fail, Fore.RED,
+            self.print_status('Finished', None, None, self._fail, _RED,
                               details=failed_details + time_details, progress_space='-')
         self.printer.newline()
 
         if self.failed_test_output:
             self.printer.print()
-            self.printer.print(Fore.RED + 'FAILED TESTS:' + Style.RESET_ALL)
+            self.printer.print(_FAILED_TESTS_HEADER)
             for test_and_case, output in self.failed_test_output.items():
                 self.printer.print(
-                    Fore.RED + self.characters.fail + ' ' + test_and_case + Style.RESET_ALL)
+                    _RED + self._fail + ' ' + test_and_case + _RESET)
                 for line in output:
                     self.printer.print('    ' + line)
 
 
 class FailuresOnlyOutput(BaseOutput):
+    __slots__ = ('max_test_name_len', 'current_test_has_output', 'total_test_count',
+                 'total_test_index', 'failed_test_count')
+
     PERCENT_WIDTH = 5
 
     def __init__(self, **kwargs):
@@ -456,7 +671,7 @@ class FailuresOnlyOutput(BaseOutput):
     def format_percent(self):
         return '%*.1f%%' % (self.PERCENT_WIDTH, self.total_test_index / self.total_test_count * 100)
 
-    def print_status(self, test_and_case, character=None, color=Fore.CYAN, include_percent=True):
+    def print_status(self, test_and_case, character=None, color=_CYAN, include_percent=True):
         line = color
         if character:
             line += character + ' '
@@ -468,12 +683,12 @@ class FailuresOnlyOutput(BaseOutput):
         if include_percent:
             line += self.format_percent()
 
-        line += Style.RESET_ALL
+        line += _RESET
 
         self.printer.print_noeol(line)
 
     def raw_output(self, test, line):
-        self.printer.print(' ' * 2 + line)
+        self.printer.print_raw(' ' * 2 + line)
         self.current_test_has_output = True
 
     def start_test_case(self, test_case, test_case_index, total_test_case_count, where=None):
@@ -486,17 +701,16 @@ class FailuresOnlyOutput(BaseOutput):
 
     def start_test(self, test_case, test, test_index, test_count):
         self.total_test_index += 1
-        self.print_status(test_case + '.' + test, self.characters.busy)
+        self.print_status(test_case + '.' + test, self._busy)
 
     def stop_test(self, status, test_case, test, test_index, test_count, time=None):
         if self.current_test_has_output or self.is_filtered or status == 'FAILED':
+            test_and_case = test_case + '.' + test
             if status == 'FAILED':
                 self.failed_test_count += 1
-                self.print_status(test_case + '.' + test,
-                                  self.characters.fail, Fore.RED, False)
+                self.print_status(test_and_case, self._fail, _RED, False)
             else:
-                self.print_status(test_case + '.' + test,
-                                  self.characters.success, Fore.GREEN, False)
+                self.print_status(test_and_case, self._success, _GREEN, False)
             self.printer.newline()
         self.current_test_has_output = False
 
@@ -513,15 +727,15 @@ class FailuresOnlyOutput(BaseOutput):
         time_details = self.format_time(time)
         if not self.failed_test_count:
             status_details = self.format_passed(total_test_count, total_test_case_count)
-            color = Fore.GREEN
-            character = self.characters.success
+            color = _GREEN
+            character = self._success
         else:
             status_details = self.format_failed(
                 self.failed_test_count, total_test_count, total_test_case_count)
-            color = Fore.RED
-            character = self.characters.fail
+            color = _RED
+            character = self._fail
         self.printer.print_noeol(
-            color + character + ' ' + status_details + Style.RESET_ALL + time_details)
+            color + character + ' ' + status_details + _RESET + time_details)
         self.printer.newline()
 
 
@@ -568,26 +782,52 @@ def print_exit_status(process, printer):
     if exit_signal is not None:
         signal_name = signal_names.get(exit_signal, 'unknown signal')
         printer.print(
-            Fore.RED + 'Terminated by %s (%i)' % (signal_name, exit_signal) + Style.RESET_ALL)
+            _RED + 'Terminated by %s (%i)' % (signal_name, exit_signal) + _RESET)
         exit_code = 128 + exit_signal
     if core_dumped:
-        printer.print(Fore.RED + 'Core dumped' + Style.RESET_ALL)
+        printer.print(_RED + 'Core dumped' + _RESET)
     return exit_code
 
 
-def pipe_as_text(input):
-    for line in input:
-        line = line.decode('utf')
+def pipe_as_text(input, chunk_size=65536):
+    """Splits a binary stream into lines of text, without their newlines.
+
+    Reads whatever is available, up to chunk_size bytes at a time, instead of
+    a line at a time, so bulk output is cheap to read but interactive output
+    isn't held back waiting for a full chunk."""
+    read = input.read1
 
-        # Normalize binary-mode Windows line endings
-        if line.endswith('\r\n'):
-            line = line[:-2] + '\n'
+    # Pieces of an incomplete line.  These are kept separate until the line is
+    # complete, so that a long line doesn't get recopied with every chunk.
+    pending = []
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
 
-        yield line
+        complete, newline, rest = chunk.rpartition(b'\n')
+        if not newline:
+            pending.append(chunk)
+            continue
+        if pending:
+            pending.append(complete)
+            complete = b''.join(pending)
+        pending = [rest] if rest else []
+
+        # Normalize binary-mode Windows line endings.  The last line's newline
+        # was split off above, so check for its carriage return separately.
+        text = complete.decode('utf-8', 'replace').replace('\r\n', '\n')
+        if text.endswith('\r'):
+            text = text[:-1]
+        yield from text.split('\n')
+
+    if pending:
+        yield b''.join(pending).decode('utf-8', 'replace')
 
 
 def main():
-    colorama.init()
+    if use_color:
+        colorama.init()
     command, output = parse_command_line()
     parser = Parser(output)
 
@@ -599,20 +839,21 @@ def main():
             print(e)
             sys.exit(1)
         test_output = test_process.stdout
-        filter = pipe_as_text
     else:
         test_process = None
-        test_output = sys.stdin
-        filter = lambda x: x
+        test_output = sys.stdin.buffer
 
-    for line in filter(test_output):
-        parser.process(line)
+    try:
+        for line in pipe_as_text(test_output):
+            parser.process(line)
+    finally:
+        output.printer.flush()
 
     exit_code = None
     if test_process:
         exit_code = print_exit_status(test_process, output.printer)
     if parser.in_test_suite:
-        output.printer.print(Fore.RED + 'Test suite aborted' + Style.RESET_ALL)
+        output.printer.print(_RED + 'Test suite aborted' + _RESET)
         sys.exit(exit_code or 1)
     elif parser.has_failures:
         sys.exit(exit_code or 1)